@@ -5,21 +5,26 @@ import io
 import os
 import json
 import time
+import random
 import requests
 import numpy as np
 import pandas as pd
 import streamlit as st
 import gspread
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from google.oauth2 import service_account
 from gspread.exceptions import APIError
+from gspread.utils import ValueRenderOption
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.units import inch
 from reportlab.platypus import (
     SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, KeepInFrame)
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import ParagraphStyle
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.platypus import Image as RLImage
@@ -31,6 +36,15 @@ st.set_page_config(page_title="Project Quotation Manager", layout="wide")
 GSHEETS_KEY_SECRET = "gsheets_key"
 GCP_SA_SECRET = "gcp_service_account"
 
+# Seconds to trust the last Drive modifiedTime before checking it again
+REVISION_TTL = 30
+# Seconds to reuse the worksheet list on the Welcome page
+WORKSHEETS_TTL = 60
+# Attempts and longest single wait (seconds) for rate-limited/5xx API calls;
+# retries block the script thread, so the worst case stays well under 30s
+API_MAX_ATTEMPTS = 4
+API_MAX_BACKOFF = 8
+
 SHEET_HEADERS = [
     "Item", "Part Number", "Description", "Qty", "Unit", "Unit Price", "Subtotal"
 ]
@@ -43,22 +57,70 @@ TERMS_LABELS = [
     ("Discount", "I8", "J8")
 ]
 
+CLIENT_LABELS = [
+    ("Title", "I14", "J14"),
+    ("Office", "I15", "J15"),
+    ("Company", "I16", "J16"),
+    ("Message", "I17", "J17"),
+    ("Edited By", "I18", "J18")
+]
+
 # ===============================================================
 # Helper Functions
 # ===============================================================
 
+def safe_to_repeat(method: str, endpoint: str) -> bool:
+    # a 5xx can arrive after the change was applied, so only reads and values writes
+    # to fixed ranges are repeated; appends and spreadsheet batchUpdates (addSheet) are not
+    if method.lower() == "get":
+        return True
+    return "/values" in endpoint and not endpoint.endswith(":append")
+
+
+class RetryingHTTPClient(gspread.HTTPClient):
+    # Retries 408/429 (never processed) and, for calls safe to repeat, 5xx with
+    # exponential backoff and full jitter, honouring Retry-After. State stays
+    # local so the shared client is safe across threads.
+    def request(self, method, endpoint, *args, **kwargs):
+        for attempt in range(API_MAX_ATTEMPTS):
+            try:
+                return super().request(method, endpoint, *args, **kwargs)
+            except APIError as e:
+                retryable = e.code in (408, 429) or (e.code >= 500 and safe_to_repeat(method, endpoint))
+                if not retryable or attempt == API_MAX_ATTEMPTS - 1:
+                    raise
+                retry_after = e.response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    wait = min(int(retry_after), API_MAX_BACKOFF)
+                else:
+                    wait = random.uniform(0, min(2 ** attempt, API_MAX_BACKOFF))
+                time.sleep(wait)
+
+
 @st.cache_resource
 def get_gspread_client():
     if GCP_SA_SECRET not in st.secrets or GSHEETS_KEY_SECRET not in st.secrets:
         st.error("Google secrets are missing. Add 'gcp_service_account' and 'gsheets_key' in Streamlit Secrets.")
         st.stop()
     creds_info = json.loads(st.secrets[GCP_SA_SECRET])
-    scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+    # full Drive access is not needed; metadata read-only covers the modifiedTime probe
+    scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive.metadata.readonly"]
     credentials = service_account.Credentials.from_service_account_info(creds_info, scopes=scopes)
-    return gspread.authorize(credentials)
-
-
-@st.cache_resource(ttl=600)
+    client = gspread.authorize(credentials, http_client=RetryingHTTPClient)
+    # one pooled keep-alive session for every Sheets call; urllib3 only retries
+    # failed connects here since status retries are already done by the client
+    adapter = HTTPAdapter(
+        pool_connections=20, pool_maxsize=20,
+        max_retries=Retry(connect=3, read=0, redirect=0, status=0, backoff_factor=0.5))
+    session = client.http_client.session
+    session.mount("https://", adapter)
+    # requests already sends Accept-Encoding: gzip, but Google APIs only gzip
+    # responses when the User-Agent mentions it too
+    session.headers["User-Agent"] = f"{session.headers.get('User-Agent', 'python-requests')} (gzip)"
+    return client
+
+
+@st.cache_resource(ttl=24 * 60 * 60)
 def open_spreadsheet():
     client = get_gspread_client()
     key = st.secrets[GSHEETS_KEY_SECRET]
@@ -69,183 +131,285 @@ def open_spreadsheet():
         st.stop()
 
 
+@st.cache_resource(ttl=24 * 60 * 60, show_spinner=False)
+def open_worksheet(_ss, spreadsheet_key: str, title: str):
+    # Spreadsheet.worksheet() fetches the sheet metadata, so the handle is shared across reruns and sessions
+    return _ss.worksheet(title)
+
+
+def invalidate_spreadsheet():
+    # a failed call may mean a stale handle, so reopen it on the next rerun
+    open_spreadsheet.clear()
+    open_worksheet.clear()
+    st.session_state.pop("spreadsheet", None)
+
+
+@st.cache_data(ttl=WORKSHEETS_TTL, show_spinner=False)
+def fetch_worksheet_titles(_ss, spreadsheet_key: str) -> list:
+    return [ws.title for ws in _ss.worksheets()]
+
+
+def list_worksheet_titles(ss, refresh=False) -> list:
+    # shared by every session; refresh re-reads the list, e.g. before creating a sheet
+    if refresh:
+        fetch_worksheet_titles.clear()
+    return fetch_worksheet_titles(ss, ss.id)
+
+
 def worksheet_create_with_headers(ss, title: str):
     ws = ss.add_worksheet(title=title, rows=100, cols=20)
-    ws.update([SHEET_HEADERS])
-    # write initial terms label cells so sheet is more user-friendly
-    label_updates = [{"range": label_cell, "values": [[label]]} for label, label_cell, _ in TERMS_LABELS]
-    ws.batch_update([{"range": u["range"], "values": u["values"]} for u in label_updates])
+    # headers plus the terms and client label cells (so the sheet is more user-friendly) in one request
+    updates = [{"range": "A1:G1", "values": [SHEET_HEADERS]}]
+    updates += [{"range": label_cell, "values": [[label]]} for label, label_cell, _ in TERMS_LABELS + CLIENT_LABELS]
+    ws.batch_update(updates)
     return ws
 
 
-def df_from_worksheet(ws) -> pd.DataFrame:
-    for attempt in range(3):
-        try:
-            values = ws.get("A1:O200")
-            if not values:
-                return pd.DataFrame(columns=SHEET_HEADERS)
-
-            raw_headers = values[0]
-            data_rows = values[1:] if len(values) > 1 else []
-            headers = raw_headers if len(raw_headers) == len(SHEET_HEADERS) else SHEET_HEADERS.copy()
-
-            normalized = []
-            for row in data_rows:
-                row = row + [""] * (len(headers) - len(row)) if len(row) < len(headers) else row[:len(headers)]
-                normalized.append(row)
-
-            df = pd.DataFrame(normalized, columns=headers)
-            for col in SHEET_HEADERS:
-                if col not in df.columns:
-                    df[col] = ""
-
-            df = df[SHEET_HEADERS]
-            df["Qty"] = pd.to_numeric(df["Qty"], errors="coerce").fillna(0)
-            df["Unit Price"] = pd.to_numeric(df["Unit Price"], errors="coerce").fillna(0)
-            df["Subtotal"] = (df["Qty"] * df["Unit Price"]).round(2)
-            return df
-
-        except APIError as e:
-            if attempt < 2:
-                time.sleep(1.5)
-                continue
-            else:
-                st.error("❌ Error reading Google Sheet — please wait and try again.")
-                st.write(str(e))
-                return pd.DataFrame(columns=SHEET_HEADERS)
-        except Exception as e:
-            st.error(f"❌ Unexpected error while reading sheet: {e}")
-            return pd.DataFrame(columns=SHEET_HEADERS)
-    return pd.DataFrame(columns=SHEET_HEADERS)
+def df_from_values(values) -> pd.DataFrame:
+    if not values:
+        return pd.DataFrame(columns=SHEET_HEADERS)
+
+    raw_headers = values[0]
+    data_rows = values[1:] if len(values) > 1 else []
+    headers = raw_headers if len(raw_headers) == len(SHEET_HEADERS) else SHEET_HEADERS.copy()
+
+    # fill one preallocated object array; short rows keep "" in their missing cells
+    ncols = len(headers)
+    if all(len(row) == ncols for row in data_rows):
+        arr = np.array(data_rows, dtype=object).reshape(len(data_rows), ncols)
+    else:
+        arr = np.full((len(data_rows), ncols), "", dtype=object)
+        for i, row in enumerate(data_rows):
+            k = min(len(row), ncols)
+            arr[i, :k] = row[:k]
+
+    df = pd.DataFrame(arr, columns=headers)
+    for col in SHEET_HEADERS:
+        if col not in df.columns:
+            df[col] = ""
+
+    df = df[SHEET_HEADERS]
+    # unformatted reads return numbers as numbers, keep the text columns as text
+    text_cols = ["Part Number", "Description", "Unit"]
+    df[text_cols] = df[text_cols].astype(str)
+    # float64 whatever the sheet holds, so whole-number columns match the editor's floats
+    num_cols = ["Qty", "Unit Price"]
+    df[num_cols] = df[num_cols].apply(pd.to_numeric, errors="coerce").astype("float64").fillna(0.0)
+    df["Subtotal"] = (df["Qty"] * df["Unit Price"]).round(2)
+    return df
+
+
+def build_items_frame(df: pd.DataFrame) -> pd.DataFrame:
+    # builds the saved frame column by column instead of chaining full-frame copies
+    qty = pd.to_numeric(df["Qty"], errors="coerce").astype("float64").fillna(0.0).to_numpy()
+    price = pd.to_numeric(df["Unit Price"], errors="coerce").astype("float64").fillna(0.0).to_numpy()
+    return pd.DataFrame({
+        "Item": np.arange(1, len(df) + 1),
+        "Part Number": df["Part Number"].to_numpy(),
+        "Description": df["Description"].to_numpy(),
+        "Qty": qty,
+        "Unit": df["Unit"].to_numpy(),
+        "Unit Price": price,
+        "Subtotal": np.round(qty * price, 2),
+    }, columns=SHEET_HEADERS)
+
+
+def sheet_revision(ss) -> str:
+    # Drive modifiedTime of the spreadsheet, re-checked at most every REVISION_TTL seconds
+    now = time.time()
+    cached = st.session_state.get("sheet_revision")
+    if cached and now - cached[1] < REVISION_TTL:
+        return cached[0]
+    try:
+        revision = ss.get_lastUpdateTime()
+    except Exception:
+        revision = str(now)
+    st.session_state.sheet_revision = (revision, now)
+    return revision
+
+
+def bump_sheet_revision():
+    # our own write changes the sheet, so skip any cached read of the old revision
+    now = time.time()
+    st.session_state.sheet_revision = (str(now), now)
+
+
+def labelled_values(labels, results) -> dict:
+    # maps each single-cell ValueRange back to its label, "" for empty or missing cells
+    results = list(results)
+    values = {}
+    for i, (label, _, _) in enumerate(labels):
+        vals = results[i] if i < len(results) else None
+        values[label] = str(vals[0][0]) if vals and vals[0] else ""
+    return values
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_project_state(_ws, spreadsheet_key: str, worksheet_title: str, revision: str):
+    # items are read unformatted so numbers arrive as numbers; the terms and client
+    # cells are free text shown as-is, so they keep the sheet's formatting
+    # (dates, percentages). A batchGet takes one render option, hence two reads.
+    items = _ws.get("A1:G", value_render_option=ValueRenderOption.unformatted)
+    term_ranges = [value_cell for _, _, value_cell in TERMS_LABELS]
+    client_ranges = [value_cell for _, _, value_cell in CLIENT_LABELS]
+    results = _ws.batch_get(term_ranges + client_ranges,
+                            value_render_option=ValueRenderOption.formatted)
+    df = df_from_values(items)
+    terms = labelled_values(TERMS_LABELS, results[:len(term_ranges)])
+    client_info = labelled_values(CLIENT_LABELS, results[len(term_ranges):])
+    return df, terms, client_info
+
+
+def load_project_state(ws):
+    # (df, terms, client_info), or None when the sheet could not be read
+    try:
+        return fetch_project_state(ws, ws.spreadsheet.id, ws.title, sheet_revision(ws.spreadsheet))
 
+    except APIError as e:
+        # the client has already backed off and retried by the time this is raised
+        st.error("❌ Error reading Google Sheet — please wait and try again.")
+        st.write(str(e))
+        invalidate_spreadsheet()
+    except Exception as e:
+        st.error(f"❌ Unexpected error while reading sheet: {e}")
+    return None
 
-def read_terms_from_ws(ws) -> dict:
-    terms = {}
-    for label, label_cell, value_cell in TERMS_LABELS:
-        try:
-            val = ws.acell(value_cell).value or ""
-        except Exception:
-            val = ""
-        terms[label] = val
-    return terms
 
+def terms_updates(terms: dict, saved: dict = None) -> list:
+    # label cells are written once by worksheet_create_with_headers; with `saved`
+    # only the values that differ from it are sent
+    return [{"range": value_cell, "values": [[terms.get(label, "")]]} for label, _, value_cell in TERMS_LABELS
+            if saved is None or saved.get(label, "") != terms.get(label, "")]
 
-def save_terms_to_ws(ws, terms: dict):
-    updates = []
-    for label, label_cell, value_cell in TERMS_LABELS:
-        updates.append({"range": label_cell, "values": [[label]]})
-        updates.append({"range": value_cell, "values": [[terms.get(label, "")]]})
-    ws.batch_update([{"range": u["range"], "values": u["values"]} for u in updates])
 
+def get_worksheet_with_retry(ss, project):
+    # retries are done by RetryingHTTPClient, this only reports the final failure
+    try:
+        return open_worksheet(ss, ss.id, project)
+    except APIError:
+        st.error(f"Failed to open worksheet '{project}'. Please try again in a few seconds.")
+        invalidate_spreadsheet()
+        st.session_state.page = "welcome"
+        st.stop()
 
-def get_worksheet_with_retry(ss, project, retries=3, delay=1):
-    for i in range(retries):
-        try:
-            return ss.worksheet(project)
-        except gspread.exceptions.APIError:
-            if i < retries - 1:
-                time.sleep(delay)
-            else:
-                st.error(f"Failed to open worksheet '{project}'. Please try again in a few seconds.")
+
+def ensure_project_state(ws, project: str):
+    session_key = f"project_df_{project}"
+    baseline_key = session_key + "_baseline"
+    terms_key = f"project_terms_{project}"
+    client_key = f"project_client_{project}"
+    # everything is cached per project so reruns don't re-read the sheet
+    if any(key not in st.session_state for key in (session_key, terms_key, client_key)):
+        state = load_project_state(ws)
+        if state is None:
+            # nothing is seeded, so a save can never diff against rows that weren't read from the sheet
+            st.button("🔄 Retry", key="retry_load")
+            if st.button("⬅️ Back", key="back_load_failed"):
                 st.session_state.page = "welcome"
-                st.stop()
+                st.rerun()
+            st.stop()
+        df, terms, client_info = state
+        df = df.reset_index(drop=True)
+        st.session_state.setdefault(session_key, df)
+        # last state known to be on the sheet, used to diff on save
+        st.session_state.setdefault(baseline_key, df.copy())
+        st.session_state.setdefault(terms_key, terms)
+        st.session_state.setdefault(client_key, client_info)
+    return session_key, baseline_key, terms_key, client_key
 
 
-def apply_sheet_updates(ws, old_df: pd.DataFrame, new_df: pd.DataFrame):
-    def get_last_data_row(ws):
-        try:
-            colA = ws.col_values(1)
-        except Exception:
-            return len(old_df) + 1
-        last = 0
-        for i, val in enumerate(colA, start=1):
-            if val is not None and str(val).strip() != "":
-                last = i
-        return last
+@st.cache_resource
+def save_executor():
+    # sheet writes run off the script thread so a slow response doesn't freeze the page
+    return ThreadPoolExecutor(max_workers=2)
+
+
+@st.fragment(run_every=0.5)
+def wait_for(future, message: str):
+    # only this fragment reruns while the job is running; the page reruns once, when it's done
+    if future.done():
+        st.rerun()
+    st.info(message)
+
 
-    old = old_df.replace({np.nan: None}).reset_index(drop=True)
-    new = new_df.replace({np.nan: None}).reset_index(drop=True)
+def sheet_rows(df: pd.DataFrame) -> list:
+    # numbers stay Python ints/floats so RAW writes land as numbers, not text
+    frame = df[SHEET_HEADERS]
+    return frame.astype(object).where(frame.notna(), "").values.tolist()
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    # one uint64 per row. Numbers are hashed as float64, so an int 2 read back from
+    # the sheet and 2.0 from the editor match; blanks stay NaN, apart from 0
+    numeric = df[["Item", "Qty", "Unit Price", "Subtotal"]].apply(pd.to_numeric, errors="coerce").astype("float64")
+    text = df[["Part Number", "Description", "Unit"]].fillna("").astype(str)
+    return pd.util.hash_pandas_object(pd.concat([numeric, text], axis=1), index=False).to_numpy()
+
+
+def apply_sheet_updates(old: pd.DataFrame, new: pd.DataFrame) -> list:
+    # Builds the {"range", "values"} payload for a single ws.batch_update call.
+    # Rows are addressed by position throughout, so the index is never used.
 
     old_len = len(old)
     new_len = len(new)
+    # serialise the new frame once; blocks below are slices of it
+    new_rows = sheet_rows(new)
 
     if old_len == 0 and new_len > 0:
-        values = [SHEET_HEADERS] + new[SHEET_HEADERS].fillna("").astype(str).values.tolist()
-        try:
-            ws.batch_clear(["A1:G200"])
-            ws.update(f"A1:G{len(values)}", values)
-        except Exception as e:
-            st.error(f"❌ Error writing full sheet: {e}")
-        return
+        values = [SHEET_HEADERS] + new_rows
+        return [{"range": f"A1:G{len(values)}", "values": values}]
 
+    # compare the overlapping rows as uint64 hashes of their normalised values
     min_len = min(old_len, new_len)
-    changed_rows = []
-    for i in range(min_len):
-        if not new.loc[i, SHEET_HEADERS].equals(old.loc[i, SHEET_HEADERS]):
-            changed_rows.append(i)
-
-    def contiguous_blocks(indices):
-        if not indices:
-            return []
-        blocks = []
-        start = indices[0]
-        end = start
-        for idx in indices[1:]:
-            if idx == end + 1:
-                end = idx
-            else:
-                blocks.append((start, end))
-                start = idx
-                end = idx
-        blocks.append((start, end))
-        return blocks
+    old_hash = row_hashes(old)
+    new_hash = row_hashes(new)
+    changed = old_hash[:min_len] != new_hash[:min_len]
 
-    blocks = contiguous_blocks(changed_rows)
+    # a run of changed rows starts where the previous row is unchanged and ends
+    # where the next one is
+    starts = np.flatnonzero(changed & ~np.r_[False, changed[:-1]])
+    ends = np.flatnonzero(changed & ~np.r_[changed[1:], False])
 
-    for (start_idx, end_idx) in blocks:
+    updates = []
+    for start_idx, end_idx in zip(starts.tolist(), ends.tolist()):
         sheet_start_row = start_idx + 2
         sheet_end_row = end_idx + 2
-        block_df = new.loc[start_idx:end_idx, SHEET_HEADERS].fillna("").astype(str)
-        values = block_df.values.tolist()
-        try:
-            ws.update(f"A{sheet_start_row}:G{sheet_end_row}", values)
-        except Exception as e:
-            st.error(f"❌ Error updating rows {sheet_start_row}-{sheet_end_row}: {e}")
+        updates.append({"range": f"A{sheet_start_row}:G{sheet_end_row}", "values": new_rows[start_idx:end_idx + 1]})
 
     if new_len > old_len:
-        last_data_row = get_last_data_row(ws)
-        start_index = old_len
-        append_block = new.loc[start_index:new_len - 1, SHEET_HEADERS].fillna("").astype(str).values.tolist()
+        # the baseline is what's on the sheet, so its rows end at old_len + 1
+        append_block = new_rows[old_len:]
         if append_block:
-            start_row = last_data_row + 1
+            start_row = old_len + 2
             end_row = start_row + len(append_block) - 1
-            try:
-                st.write(f"Appending rows at sheet rows {start_row}..{end_row} -> {len(append_block)} rows")
-                ws.update(f"A{start_row}:G{end_row}", append_block)
-            except Exception as e:
-                st.error(f"❌ Error appending rows {start_row}-{end_row}: {e}")
+            updates.append({"range": f"A{start_row}:G{end_row}", "values": append_block})
 
     if new_len < old_len:
-        values = [SHEET_HEADERS] + new[SHEET_HEADERS].fillna("").astype(str).values.tolist()
-        try:
-            ws.batch_clear(["A1:G200"])
-            ws.update(f"A1:G{len(values)}", values)
-        except Exception as e:
-            st.error(f"❌ Error rewriting entire sheet: {e}")
+        # blank only the rows that were removed; blanks ride in the same batch as the edits
+        blanks = [[""] * len(SHEET_HEADERS)] * (old_len - new_len)
+        updates.append({"range": f"A{new_len + 2}:G{old_len + 1}", "values": blanks})
 
+    return updates
 
-def save_totals_to_ws(ws, total, vat, grand_total):
-    updates = [
-        {"range": "I9", "values": [["Total"]]},
-        {"range": "J9", "values": [[str(total)]]},
 
-        {"range": "I10", "values": [["VAT (12%)"]]},
-        {"range": "J10", "values": [[str(vat)]]},
+def compute_totals(df, discount_text) -> tuple:
+    # one pass over Subtotal; an unparseable discount counts as none
+    total = float(df["Subtotal"].sum())
+    try:
+        discount = float(discount_text or 0)
+    except ValueError:
+        discount = 0.0
+    vat = total * 0.12
+    return total, discount, vat, total + vat - discount
 
-        {"range": "I11", "values": [["Grand Total"]]},
-        {"range": "J11", "values": [[str(grand_total)]]},
-    ]
-    ws.batch_update(updates)
+
+def totals_updates(total, vat, grand_total) -> list:
+    # labels and values are adjacent, so the whole block is one range
+    return [{"range": "I9:J11", "values": [
+        ["Total", float(total)],
+        ["VAT (12%)", float(vat)],
+        ["Grand Total", float(grand_total)],
+    ]}]
 
 # ===============================================================
 # PDF Generator
@@ -257,206 +421,252 @@ FONT_DIR = os.path.join(BASE_DIR, "fonts")
 
 def font(file):
     return os.path.join(FONT_DIR, file)
-pdfmetrics.registerFont(TTFont('Arial', font('ARIAL.TTF')))
-pdfmetrics.registerFont(TTFont('Arial-Bold', font('ARIALBD.TTF')))
-pdfmetrics.registerFont(TTFont('Arial-Narrow', font('ARIALN.TTF')))
-pdfmetrics.registerFont(TTFont('Calibri', font('CALIBRI.TTF')))
-pdfmetrics.registerFont(TTFont('Calibri-Bold', font('CALIBRIB.TTF')))
+
+
+@st.cache_resource
+def register_fonts():
+    # TTFont parses the whole file, so do it once per process, not on every rerun
+    pdfmetrics.registerFont(TTFont('Arial', font('ARIAL.TTF')))
+    pdfmetrics.registerFont(TTFont('Arial-Bold', font('ARIALBD.TTF')))
+    pdfmetrics.registerFont(TTFont('Arial-Narrow', font('ARIALN.TTF')))
+    pdfmetrics.registerFont(TTFont('Calibri', font('CALIBRI.TTF')))
+    pdfmetrics.registerFont(TTFont('Calibri-Bold', font('CALIBRIB.TTF')))
+
+
+register_fonts()
+
+
+ASSETS_DIR = os.path.join(BASE_DIR, "assets")
+ASSETS_URL = "https://raw.githubusercontent.com/bucangrexor-boop/proj-quote-manager/main/assets"
+
+
+def asset(file):
+    # the logos ship with the app; the GitHub copy is only a fallback
+    local = os.path.join(ASSETS_DIR, file)
+    return local if os.path.exists(local) else f"{ASSETS_URL}/{file}"
+
+
+@st.cache_resource
+def http_session():
+    # keep-alive session for asset downloads, retrying transient server errors
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    session.mount("https://", HTTPAdapter(max_retries=retry))
+    return session
+
+
+@st.cache_resource(show_spinner=False)
+def logo_bytes(url_or_path: str) -> bytes:
+    # raw image bytes, fetched once per process instead of once per export;
+    # bytes are immutable, so every session can share them. Failures aren't cached
+    if url_or_path.startswith("http"):
+        response = http_session().get(url_or_path, timeout=5)
+        response.raise_for_status()
+        return response.content
+    with open(url_or_path, "rb") as f:
+        return f.read()
+
+
+def pdf_logos() -> tuple:
+    # (left, right) logo bytes for generate_pdf, resolved on the script thread since
+    # the caches above need its context; a logo that can't be loaded is None
+    logos = []
+    for file in ("logoants.png", "antslogo2.png"):
+        try:
+            logos.append(logo_bytes(asset(file)))
+        except Exception:
+            logos.append(None)
+    return tuple(logos)
+
+
+# Paragraph and table styles are plain data, so they are built once at import
+PRICE_QUOTE_STYLE = ParagraphStyle("PriceQuote", fontName="Calibri-Bold", fontSize=8, alignment=1)
+REF_STYLE = ParagraphStyle("RefStyle", fontName="Arial-Narrow", fontSize=7, alignment=1)
+REF2_STYLE = ParagraphStyle("Ref2Style", fontName="Arial-Narrow", fontSize=7, alignment=0)
+TITLE_STYLE = ParagraphStyle("TitleStyle", fontName="Arial-Bold", fontSize=8, alignment=0)
+OFFICE_STYLE = ParagraphStyle("OfficeStyle", fontName="Arial-Bold", fontSize=7, alignment=0, leading=7)
+NORMAL_STYLE = ParagraphStyle("NormalStyle", fontName="Arial", fontSize=7, alignment=0, leading=7)
+WRAP_STYLE = ParagraphStyle(name="WrapStyle", fontName="Arial", fontSize=7, leading=7)
+TOTALS_STYLE = ParagraphStyle(name="TotalsStyle", fontName="Arial", fontSize=7, leading=7, alignment = 2)
+BODY_STYLE_RIGHT = ParagraphStyle(name="BodyStyleRight", fontName="Arial", fontSize=7, leading=7, alignment=1)
+
+HEADER_TABLE_STYLE = TableStyle([
+    ("VALIGN", (0,0), (-1,-1), "TOP"),
+    ("ALIGN", (1,0), (1,0), "RIGHT"),
+    ("BOTTOMPADDING", (0,0), (-1,-1), 0)
+])
+
+ITEMS_TABLE_STYLE = TableStyle([
+    ("GRID", (0, 0), (-1, -1), 0.3, colors.grey),
+    ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+
+    # Header alignment
+    ("ALIGN", (0, 0), (1, 0), "CENTER"),
+    ("ALIGN", (2, 0), (-1, 0), "CENTER"),
+
+    # Body
+    ("ALIGN", (0, 1), (0, -1), "CENTER"),
+    ("ALIGN", (1, 1), (1, -1), "CENTER"),
+    ("ALIGN", (2, 1), (2, -1), "LEFT"),
+    ("ALIGN", (3, 1), (3, -1), "RIGHT"),
+    ("ALIGN", (4, 1), (4, -1), "CENTER"),
+    ("ALIGN", (5, 1), (6, -1), "RIGHT"),
+
+    # Item and Unit are plain strings, drawn in the Paragraph body font
+    ("FONTNAME", (0,1), (0,-1), "Arial"),
+    ("FONTNAME", (4,1), (4,-1), "Arial"),
+
+    # Font sizes
+    ("FONTSIZE", (0,0), (-1,0), 8),
+    ("FONTSIZE", (0,1), (0,-1), 7),
+    ("FONTSIZE", (3,1), (3,-1), 7),
+    ("FONTSIZE", (4,1), (6,-1), 7),
+
+    ("TOPPADDING", (0,0), (-1,-1), 0),
+    ("BOTTOMPADDING", (0,0), (-1,-1), 0),
+])
+
+TOTALS_TABLE_STYLE = TableStyle([
+    ("ALIGN", (0, 0), (-1, -1), "RIGHT"),
+    ("GRID", (0, 0), (-1, -1), 0.3, colors.grey),
+    ("BACKGROUND", (0, -1), (-1, -1), colors.Color(0.75, 0.88, 0.65)),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ("TOPPADDING", (0,0), (-1,-1), 1),
+    ("BOTTOMPADDING", (0,0), (-1,-1), 1),
+    ("LEFTPADDING", (0,0), (-1,-1), 1),
+    ("RIGHTPADDING", (0,0), (-1,-1), 1),
+])
+
+TOTALS_WRAPPER_STYLE = TableStyle([
+    ("ALIGN", (1, 0), (1, 0), "RIGHT"),
+    ("TOPPADDING", (0,0), (-1,-1), 1),
+    ("BOTTOMPADDING", (0,0), (-1,-1), 1),
+    ("LEFTPADDING", (0,0), (-1,-1), 0),
+    ("RIGHTPADDING", (0,0), (-1,-1), 0),
+])
+
+# Page size and margins are fixed, so the item table column widths are too
+PDF_SIDE_MARGIN = 54
+_PROPORTIONS = [0.0748, 0.1247, 0.4420, 0.0402, 0.0474, 0.1338, 0.1371]
+ITEM_COL_WIDTHS = [(A4[0] - 2 * PDF_SIDE_MARGIN) * p / sum(_PROPORTIONS) for p in _PROPORTIONS]
+# the totals sit under Unit Price and Subtotal, offset by the columns to their left
+TOTALS_LEFT_WIDTH = sum(ITEM_COL_WIDTHS[:5])
+TOTALS_COL_WIDTHS = ITEM_COL_WIDTHS[5:7]
+
+
+@st.cache_resource
+def pdf_executor():
+    # PDFs are built off the script thread so the page keeps rendering
+    return ThreadPoolExecutor(max_workers=2)
+
 
 def generate_pdf(project_name, df, totals, terms, client_info=None,
-                 left_logo_path=None, right_logo_path=None):
+                 left_logo=None, right_logo=None):
+    # left_logo/right_logo are raw image bytes (see pdf_logos); None leaves a blank space
 
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(
         buffer,
         pagesize=A4,
-        rightMargin=54,
-        leftMargin=54,
+        rightMargin=PDF_SIDE_MARGIN,
+        leftMargin=PDF_SIDE_MARGIN,
         topMargin=72,
         bottomMargin=72
     )
 
     elements = []
-    styles = getSampleStyleSheet()
-
-    # -----------------------------------
-    # Custom Styles (unchanged)
-    # -----------------------------------
-    price_quote_style = ParagraphStyle("PriceQuote", fontName="Calibri-Bold", fontSize=8, alignment=1)
-    ref_style = ParagraphStyle("RefStyle", fontName="Arial-Narrow", fontSize=7, alignment=1)
-    ref2_style = ParagraphStyle("Ref2Style", fontName="Arial-Narrow", fontSize=7, alignment=0)
-    title_style = ParagraphStyle("TitleStyle", fontName="Arial-Bold", fontSize=8, alignment=0)
-    office_style = ParagraphStyle("OfficeStyle", fontName="Arial-Bold", fontSize=7, alignment=0, leading=7)
-    normal_style = ParagraphStyle("NormalStyle", fontName="Arial", fontSize=7, alignment=0, leading=7)
-    wrap_style = ParagraphStyle(name="WrapStyle", fontName="Arial", fontSize=7, leading=7)
-    body_style = ParagraphStyle(name="BodyStyle", fontName="Arial", fontSize=7, leading=7, alignment=0)
-    totals_style = ParagraphStyle(name="TotalsStyle", fontName="Arial", fontSize=7, leading=7, alignment = 2)
-    header_style = ParagraphStyle(name="HeaderStyle", fontName="Arial-Bold", fontSize=9,)
-    body_style_right = ParagraphStyle(name="BodyStyleRight", fontName="Arial", fontSize=7, leading=7, alignment=1)
 
     # -----------------------------------
-    # Load logos (unchanged)
+    # Logos
     # -----------------------------------
-    def load_logo(url_or_path, width=None, height=None):
+    def load_logo(data, width=None, height=None):
+        if not data:
+            return Spacer(width or 50, height or 20)
         try:
-            if url_or_path.startswith("http"):
-                response = requests.get(url_or_path)
-                response.raise_for_status()
-                img_data = io.BytesIO(response.content)
-                img = RLImage(img_data, width=width, height=height)
-            else:
-                img = RLImage(url_or_path, width=width, height=height)
+            img = RLImage(io.BytesIO(data), width=width, height=height)
             img.hAlign = 'LEFT'
             return img
         except:
             return Spacer(width or 50, height or 20)
 
-    left_logo = load_logo(left_logo_path or
-                          "https://raw.githubusercontent.com/bucangrexor-boop/proj-quote-manager/main/assets/logoants.png",
-                          width=121.32 * 0.75, height=50 * 0.75)
+    left_logo = load_logo(left_logo, width=121.32 * 0.75, height=50 * 0.75)
 
-    right_logo = load_logo(right_logo_path or
-                          "https://raw.githubusercontent.com/bucangrexor-boop/proj-quote-manager/main/assets/antslogo2.png",
-                          width=201.89 * 0.75, height=17.33 * 0.75)
+    right_logo = load_logo(right_logo, width=201.89 * 0.75, height=17.33 * 0.75)
 
     # -----------------------------------
     # Header
     # -----------------------------------
     header_table = Table([[left_logo, right_logo]], colWidths=[3*inch, 3*inch])
-    header_table.setStyle(TableStyle([
-        ("VALIGN", (0,0), (-1,-1), "TOP"),
-        ("ALIGN", (1,0), (1,0), "RIGHT"),
-        ("BOTTOMPADDING", (0,0), (-1,-1), 0)
-    ]))
-    elements.append(header_table)
-    elements.append(Spacer(1, 0))
-
-    # Title
-    elements.append(Paragraph("P R I C E   Q U O T E", price_quote_style))
-    elements.append(Spacer(1, 0))
-    elements.append(Paragraph(f"Ref No. {project_name}", ref_style))
-    elements.append(Spacer(1, 0))
-
+    header_table.setStyle(HEADER_TABLE_STYLE)
     date_str = datetime.now().strftime("%d-%b-%y")
-    elements.append(Paragraph(f'<para alignment="right"><b>Date</b> {date_str}</para>', ref_style))
-    elements.append(Spacer(1, 10))
+    elements.extend([
+        header_table,
+        Spacer(1, 0),
+        # Title
+        Paragraph("P R I C E   Q U O T E", PRICE_QUOTE_STYLE),
+        Spacer(1, 0),
+        Paragraph(f"Ref No. {project_name}", REF_STYLE),
+        Spacer(1, 0),
+        Paragraph(f'<para alignment="right"><b>Date</b> {date_str}</para>', REF_STYLE),
+        Spacer(1, 10),
+    ])
 
     # -----------------------------------
     # Client Info (unchanged)
     # -----------------------------------
     if client_info:
-        elements.append(Paragraph(f"<b>{client_info.get('Title', '')}</b>", title_style))
-        elements.append(Spacer(1, 10))
-        elements.append(Paragraph(client_info.get('Office', ''), office_style))
-        elements.append(Paragraph(client_info.get("Company", ""), normal_style))
-        elements.append(Spacer(1, 10))
-        elements.append(Paragraph("Dear Sir:", normal_style))
-        elements.append(Spacer(1, 10))
-        elements.append(Paragraph(client_info.get("Message", ""), normal_style))
-        elements.append(Spacer(1, 10))
-
-    # -----------------------------------
-    # Build Table Data (fixed subtotal logic)
-    # -----------------------------------
-    header = df.columns.tolist()
-    table_raw = [header]
-
-    for i, row in df.reset_index(drop=True).iterrows():
-        # DO NOT FORMAT NUMBERS HERE
-        item_no = i + 1 if pd.isna(row.get("Item")) or row.get("Item") == "" else row.get("Item")
-        
-        table_raw.append([
-            item_no,
-            str(row.get("Part Number", "")),
-            Paragraph(str(row.get("Description", "")), wrap_style),
-            row.get("Qty", 0),
-            str(row.get("Unit", "")),
-            row.get("Unit Price", 0),
-            row.get("Subtotal", 0),
+        elements.extend([
+            Paragraph(f"<b>{client_info.get('Title', '')}</b>", TITLE_STYLE),
+            Spacer(1, 10),
+            Paragraph(client_info.get('Office', ''), OFFICE_STYLE),
+            Paragraph(client_info.get("Company", ""), NORMAL_STYLE),
+            Spacer(1, 10),
+            Paragraph("Dear Sir:", NORMAL_STYLE),
+            Spacer(1, 10),
+            Paragraph(client_info.get("Message", ""), NORMAL_STYLE),
+            Spacer(1, 10),
         ])
 
     # -----------------------------------
-    # Column widths (unchanged)
-    # -----------------------------------
-    PAGE_WIDTH, _ = A4
-    available_width = PAGE_WIDTH - (doc.leftMargin + doc.rightMargin)
-    proportions = [0.0748, 0.1247, 0.4420, 0.0402, 0.0474, 0.1338, 0.1371]
-    proportions = [p / sum(proportions) for p in proportions]
-    col_widths = [available_width * p for p in proportions]
-
-    # -----------------------------------
-    # Convert numeric cells -> formatted text
+    # Build Table Data (columns converted up front, rows zipped together)
     # -----------------------------------
-    table_rows = []
-    for r_idx, row in enumerate(table_raw):
-        processed_row = []
-        for c_idx, cell in enumerate(row):
-
-            # Header row stays unchanged
-            if r_idx == 0:
-                processed_row.append(cell)
-                continue
-
-            # Description stays Paragraph
-            if c_idx == 2:
-                processed_row.append(cell)
-                continue
-
-            # Qty
-            if c_idx == 3:
-                try:
-                    processed_row.append(str(int(cell)))
-                except:
-                    processed_row.append("0")
-                continue
-
-            # Price & Subtotal
-            if c_idx in (5, 6):
-                try:
-                    val = float(cell)
-                except:
-                    # remove commas if string
-                    try:
-                        val = float(str(cell).replace(",", ""))
-                    except:
-                        val = 0
-                processed_row.append(f"{val:,.2f}")
-                continue
-
-            # Right aligned paragraphs
-            processed_row.append(Paragraph(str(cell), body_style_right))
-
-        table_rows.append(processed_row)
+    def numeric(col):
+        # strings may carry thousands separators; anything unparsable counts as 0
+        if col.dtype == object or pd.api.types.is_string_dtype(col):
+            col = col.astype(str).str.replace(",", "", regex=False)
+        values = pd.to_numeric(col, errors="coerce").to_numpy(dtype=float, na_value=0.0)
+        return np.where(np.isfinite(values), values, 0.0)
+
+    items = df.reset_index(drop=True)
+    item_col = items["Item"]
+    blank_item = (item_col.isna() | (item_col.astype(str) == "")).to_numpy()
+    item_nos = np.where(blank_item, np.arange(1, len(items) + 1), item_col.to_numpy(dtype=object))
+    qtys = numeric(items["Qty"]).astype(int)
+    unit_prices = numeric(items["Unit Price"])
+    subtotals = numeric(items["Subtotal"])
+
+    table_rows = [df.columns.tolist()]
+    table_rows.extend(
+        [
+            str(item_no),
+            Paragraph(str(part_no), BODY_STYLE_RIGHT),
+            Paragraph(str(description), WRAP_STYLE),
+            str(qty),
+            str(unit),
+            f"{unit_price:,.2f}",
+            f"{subtotal:,.2f}",
+        ]
+        for item_no, part_no, description, qty, unit, unit_price, subtotal in zip(
+            item_nos, items["Part Number"], items["Description"], qtys,
+            items["Unit"], unit_prices, subtotals)
+    )
 
     # -----------------------------------
     # Main Table (unchanged formatting)
     # -----------------------------------
-    table = Table(table_rows, colWidths=col_widths, repeatRows=1)
-    table.setStyle(TableStyle([
-        ("GRID", (0, 0), (-1, -1), 0.3, colors.grey),
-        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-
-        # Header alignment
-        ("ALIGN", (0, 0), (1, 0), "CENTER"),
-        ("ALIGN", (2, 0), (-1, 0), "CENTER"),
-
-        # Body
-        ("ALIGN", (0, 1), (0, -1), "CENTER"),
-        ("ALIGN", (1, 1), (1, -1), "CENTER"),
-        ("ALIGN", (2, 1), (2, -1), "LEFT"),
-        ("ALIGN", (3, 1), (3, -1), "RIGHT"),
-        ("ALIGN", (4, 1), (4, -1), "RIGHT"),
-        ("ALIGN", (5, 1), (6, -1), "RIGHT"),
-
-        # Font sizes
-        ("FONTSIZE", (0,0), (-1,0), 8),
-        ("FONTSIZE", (3,1), (3,-1), 7),
-        ("FONTSIZE", (5,1), (6,-1), 7),
-
-        ("TOPPADDING", (0,0), (-1,-1), 0),
-        ("BOTTOMPADDING", (0,0), (-1,-1), 0),
-    ]))
+    table = Table(table_rows, colWidths=ITEM_COL_WIDTHS, repeatRows=1)
+    table.setStyle(ITEMS_TABLE_STYLE)
 
     elements.append(table)
     elements.append(Spacer(1, 0))
@@ -464,9 +674,6 @@ def generate_pdf(project_name, df, totals, terms, client_info=None,
     # -----------------------------------
     # Totals Table (unchanged)
     # -----------------------------------
-    unit_price_i, subtotal_i = 5, 6
-    left_space_w = sum(col_widths[:unit_price_i])
-    totals_w = col_widths[unit_price_i] + col_widths[subtotal_i]
 
     totals_rows = [
         ["Subtotal", f"₱ {totals['subtotal']:,.2f}"],
@@ -474,33 +681,18 @@ def generate_pdf(project_name, df, totals, terms, client_info=None,
         ["VAT (12%)", f"₱ {totals['vat']:,.2f}"],
         ["TOTAL", f"₱ {totals['total']:,.2f}"],
     ]
-    totals_data = [[Paragraph(label, totals_style), Paragraph(value, totals_style)] for label, value in totals_rows]
+    totals_data = [[Paragraph(label, TOTALS_STYLE), Paragraph(value, TOTALS_STYLE)] for label, value in totals_rows]
     totals_data[-1] = [
-        Paragraph("<b>TOTAL</b>", totals_style),
-        Paragraph(f"<b>₱ {totals['total']:,.2f}</b>", totals_style),
+        Paragraph("<b>TOTAL</b>", TOTALS_STYLE),
+        Paragraph(f"<b>₱ {totals['total']:,.2f}</b>", TOTALS_STYLE),
     ]
 
-    totals_table = Table(totals_data, colWidths=[col_widths[unit_price_i], col_widths[subtotal_i]])
-    totals_table.setStyle(TableStyle([
-        ("ALIGN", (0, 0), (-1, -1), "RIGHT"),
-        ("GRID", (0, 0), (-1, -1), 0.3, colors.grey),
-        ("BACKGROUND", (0, -1), (-1, -1), colors.Color(0.75, 0.88, 0.65)),
-        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-        ("TOPPADDING", (0,0), (-1,-1), 1),
-        ("BOTTOMPADDING", (0,0), (-1,-1), 1),
-        ("LEFTPADDING", (0,0), (-1,-1), 1),
-        ("RIGHTPADDING", (0,0), (-1,-1), 1),
-    ]))
-
-    wrapper_table = Table([[Spacer(left_space_w, 0), totals_table]],
-                          colWidths=[left_space_w, totals_w])
-    wrapper_table.setStyle(TableStyle([
-        ("ALIGN", (1, 0), (1, 0), "RIGHT"),
-        ("TOPPADDING", (0,0), (-1,-1), 1),
-        ("BOTTOMPADDING", (0,0), (-1,-1), 1),
-        ("LEFTPADDING", (0,0), (-1,-1), 0),
-        ("RIGHTPADDING", (0,0), (-1,-1), 0),
-    ]))
+    totals_table = Table(totals_data, colWidths=TOTALS_COL_WIDTHS)
+    totals_table.setStyle(TOTALS_TABLE_STYLE)
+
+    wrapper_table = Table([[Spacer(TOTALS_LEFT_WIDTH, 0), totals_table]],
+                          colWidths=[TOTALS_LEFT_WIDTH, sum(TOTALS_COL_WIDTHS)])
+    wrapper_table.setStyle(TOTALS_WRAPPER_STYLE)
 
     elements.append(wrapper_table)
 
@@ -508,22 +700,23 @@ def generate_pdf(project_name, df, totals, terms, client_info=None,
     # Terms (unchanged)
     # -----------------------------------
     elements.append(Spacer(1, 64))
-    for k, v in terms.items():
-        if k == "Discount":
-            continue
-        elements.append(Paragraph(f"<b>{k}:</b> {v}", normal_style))
+    elements.extend(Paragraph(f"<b>{k}:</b> {v}", NORMAL_STYLE) for k, v in terms.items() if k != "Discount")
 
     # -----------------------------------
     # Sign Off (unchanged)
     # -----------------------------------
-    elements.append(Paragraph("Thank you for doing business with us!", normal_style))
-    elements.append(Spacer(1, 12))
-    elements.append(Paragraph("Respectfully yours,", normal_style))
-    elements.append(Spacer(1, 30))
+    elements.extend([
+        Paragraph("Thank you for doing business with us!", NORMAL_STYLE),
+        Spacer(1, 12),
+        Paragraph("Respectfully yours,", NORMAL_STYLE),
+        Spacer(1, 30),
+    ])
 
     if client_info:
-        elements.append(Paragraph(client_info.get("Edited By", ""), normal_style))
-        elements.append(Paragraph("Ants Technologies, Inc.", ref2_style))
+        elements.extend([
+            Paragraph(client_info.get("Edited By", ""), NORMAL_STYLE),
+            Paragraph("Ants Technologies, Inc.", REF2_STYLE),
+        ])
 
     # -----------------------------------
     # Build PDF
@@ -532,6 +725,14 @@ def generate_pdf(project_name, df, totals, terms, client_info=None,
     buffer.seek(0)
     return buffer
 
+
+def pdf_bytes(project_name, df, totals, terms, client_info, logos) -> bytes:
+    # runs on pdf_executor, which has no ScriptRunContext, so nothing here may touch st.*;
+    # logos come from pdf_logos() on the script thread
+    left_logo, right_logo = logos
+    return generate_pdf(project_name, df, totals, terms, client_info=client_info,
+                        left_logo=left_logo, right_logo=right_logo).getvalue()
+
 # ===============================================================
 # UI Pages
 # ===============================================================
@@ -554,7 +755,7 @@ if st.session_state.page == "welcome":
         st.session_state.page = "create_project"
 
     st.subheader("Existing Projects")
-    worksheets = [ws.title for ws in ss.worksheets()]
+    worksheets = list_worksheet_titles(ss)
     search = st.text_input("Filter projects", key="filter_projects")
     filtered = [w for w in worksheets if search.lower() in w.lower()]
 
@@ -577,10 +778,11 @@ elif st.session_state.page == "create_project":
     if st.button("Create", key="btn_create_project"):
         if not project_name:
             st.warning("Please enter a project name.")
-        elif project_name in [ws.title for ws in ss.worksheets()]:
+        elif project_name in list_worksheet_titles(ss, refresh=True):
             st.error("Project already exists.")
         else:
             ws = worksheet_create_with_headers(ss, project_name)
+            fetch_worksheet_titles.clear()
             st.session_state.current_project = project_name
             st.session_state.page = "project"
 
@@ -594,15 +796,10 @@ elif st.session_state.page == "project":
     project = st.session_state.get("current_project")
 
     # Get worksheet
-    if "ws" not in st.session_state or st.session_state.get("ws_project") != project:
-        st.session_state.ws = get_worksheet_with_retry(ss, project)
-        st.session_state.ws_project = project
-    ws = st.session_state.ws
+    ws = get_worksheet_with_retry(ss, project)
 
-    # Session DF key
-    session_key = f"project_df_{project}"
-    if session_key not in st.session_state:
-        st.session_state[session_key] = df_from_worksheet(ws).reset_index(drop=True)
+    # Session keys, seeded once per project
+    session_key, baseline_key, terms_key, client_key = ensure_project_state(ws, project)
 
     st.markdown(f"### 🧾 Project: {project}")
 
@@ -612,30 +809,50 @@ elif st.session_state.page == "project":
         if st.button("⬅️ Back", key="back_top"):
             st.session_state.page = "welcome"
 
+    pdf_key = f"pdf_future_{project}"
+    with col3:
+        # saves diff against the session copy; this drops it and re-reads the sheet
+        reload_sheet = st.button("🔄 Reload", key="reload_sheet",
+                                 disabled=f"pending_save_{project}" in st.session_state)
+    if reload_sheet:
+        for key in (session_key, baseline_key, terms_key, client_key, session_key + "_totals", pdf_key):
+            st.session_state.pop(key, None)
+        bump_sheet_revision()
+        st.rerun()
+
     with col4:
         export_pdf = st.button("📄 Export PDF", key="export_pdf")
         
-    pdf_buffer = None
     if export_pdf:
         try:
             sheet_df = st.session_state[session_key]
-            terms = read_terms_from_ws(ws)
-            totals = {
-                "subtotal": sheet_df["Subtotal"].sum(),
-                "discount": float(ws.acell("J8").value or 0),
-                "vat": sheet_df["Subtotal"].sum() * 0.12,
-                "total": sheet_df["Subtotal"].sum() + (sheet_df["Subtotal"].sum() * 0.12) - float(ws.acell("J8").value or 0)
-            }
-            client_info = {
-                "Title": ws.acell("J14").value or "",
-                "Office": ws.acell("J15").value or "",
-                "Company": ws.acell("J16").value or "",
-                "Message": ws.acell("J17").value or "",
-                "Edited By": ws.acell("J18").value or ""
-            }
-            pdf_buffer = generate_pdf(project, sheet_df, totals, terms, client_info=client_info)
+            terms = st.session_state[terms_key]
+            total, discount, vat, grand_total = compute_totals(sheet_df, terms.get("Discount"))
+            totals = {"subtotal": total, "discount": discount, "vat": vat, "total": grand_total}
+            client_info = st.session_state[client_key]
+            # the date is part of the inputs because it is printed on the quote
+            inputs = (totals, dict(terms), dict(client_info), datetime.now().strftime("%d-%b-%y"))
+            previous = st.session_state.get(pdf_key)
+            # an identical export reuses the finished (or running) build instead of starting another
+            if previous is None or previous[2:] != inputs or not previous[1].equals(sheet_df):
+                future = pdf_executor().submit(
+                    pdf_bytes, project, sheet_df.copy(), totals, dict(terms), dict(client_info), pdf_logos())
+                st.session_state[pdf_key] = (future, sheet_df.copy()) + inputs
         except Exception as e:
             st.error(f"❌ Failed to generate PDF: {e}")
+
+    pdf_buffer = None
+    pdf_export = st.session_state.get(pdf_key)
+    if pdf_export is not None:
+        pdf_future = pdf_export[0]
+        if pdf_future.done():
+            try:
+                pdf_buffer = pdf_future.result()
+            except Exception as e:
+                st.error(f"❌ Failed to generate PDF: {e}")
+                del st.session_state[pdf_key]
+        else:
+            wait_for(pdf_future, "⏳ Generating PDF...")
     with col5:
         if pdf_buffer:
             st.download_button(
@@ -658,34 +875,50 @@ elif st.session_state.page == "project":
         )
 
         submit = st.form_submit_button("💾 Save Changes")
+        save_key = f"pending_save_{project}"
         if submit:
-            with st.spinner("Saving changes..."):
-                try:
-                    new_df = edited_df.copy()
-                    for col in ["Qty", "Unit Price"]:
-                        new_df[col] = pd.to_numeric(new_df[col], errors="coerce").fillna(0)
-                    new_df["Subtotal"] = (new_df["Qty"] * new_df["Unit Price"]).round(2)
-                    new_df["Item"] = range(1, len(new_df) + 1)
-
-                    old_df = df_from_worksheet(ws).reset_index(drop=True)
-                    apply_sheet_updates(ws, old_df, new_df)
-
-                    # Compute totals
-                    total = new_df["Subtotal"].sum()
-                    try:
-                        discount = float(ws.acell("J8").value or 0)
-                    except:
-                        discount = 0.0
-                    vat = total * 0.12
-                    grand_total = total + vat - discount
-
-                    save_totals_to_ws(ws, total, vat, grand_total)
-
-                    st.session_state[session_key] = new_df.copy()
-                    st.session_state[session_key + "_totals"] = (total, discount, vat, grand_total)
-                    st.success("✅ Changes saved to Google Sheets!")
-                except Exception as e:
-                    st.error(f"❌ Failed to save changes: {e}")
+            try:
+                new_df = build_items_frame(edited_df)
+
+                old_df = st.session_state[baseline_key]
+                updates = apply_sheet_updates(old_df, new_df)
+
+                # Compute totals
+                total, discount, vat, grand_total = compute_totals(
+                    new_df, st.session_state[terms_key].get("Discount"))
+
+                if save_key in st.session_state:
+                    # the diff above is against a baseline the running save will replace
+                    st.warning("A save is still in progress, please try again in a moment.")
+                # the row hashes matched and the totals are what we last wrote
+                elif not updates and st.session_state.get(session_key + "_totals") == (total, discount, vat, grand_total):
+                    st.info("No changes to save.")
+                else:
+                    # row changes and totals go out in a single request
+                    future = save_executor().submit(
+                        ws.batch_update, updates + totals_updates(total, vat, grand_total))
+                    st.session_state[save_key] = (future, new_df, (total, discount, vat, grand_total))
+            except Exception as e:
+                st.error(f"❌ Failed to save changes: {e}")
+
+    pending_save = st.session_state.get(save_key)
+    if pending_save is not None:
+        future, new_df, saved_totals = pending_save
+        if future.done():
+            del st.session_state[save_key]
+            try:
+                future.result()
+                st.session_state[session_key] = new_df.copy()
+                st.session_state[baseline_key] = new_df.copy()
+                bump_sheet_revision()
+                # an exported PDF no longer matches the saved rows
+                st.session_state.pop(pdf_key, None)
+                st.session_state[session_key + "_totals"] = saved_totals
+                st.success("✅ Changes saved to Google Sheets!")
+            except Exception as e:
+                st.error(f"❌ Failed to save changes: {e}")
+        else:
+            wait_for(future, "⏳ Saving changes...")
 
     # -----------------------
     # Totals Display
@@ -702,7 +935,7 @@ elif st.session_state.page == "project":
     # -----------------------
     st.markdown("---")
     st.subheader("Terms & Conditions")
-    terms = read_terms_from_ws(ws)
+    terms = st.session_state[terms_key]
     with st.form("terms_form"):
         col1, col2 = st.columns(2)
         with col1:
@@ -715,24 +948,39 @@ elif st.session_state.page == "project":
 
         submit_terms = st.form_submit_button("Save Terms")
         if submit_terms:
-            save_terms_to_ws(ws, {
+            new_terms = {
                 "TERMS OF PAYMENT": t_payment,
                 "DELIVERY": t_DELIVERY,
                 "WARRANTY": t_WARRANTY,
                 "PRICE VALIDITY": t_price,
                 "Discount": t_discount
-            })
-            st.success("Saved terms successfully.")
+            }
+            updates = terms_updates(new_terms, saved=terms)
+            if f"pending_save_{project}" in st.session_state:
+                st.warning("A save is still in progress, please try again in a moment.")
+            elif not updates:
+                st.info("No changes to save.")
+            else:
+                new_totals = None
+                if new_terms["Discount"] != terms.get("Discount", ""):
+                    # the discount feeds the grand total, so the totals block goes out in the same request
+                    new_totals = compute_totals(st.session_state[baseline_key], t_discount)
+                    total, discount, vat, grand_total = new_totals
+                    updates += totals_updates(total, vat, grand_total)
+                try:
+                    ws.batch_update(updates)
+                    # session state only moves once the sheet has the new values
+                    if new_totals is not None:
+                        st.session_state[session_key + "_totals"] = new_totals
+                    st.session_state[terms_key] = new_terms
+                    bump_sheet_revision()
+                    st.success("Saved terms successfully.")
+                except APIError as e:
+                    st.error(f"❌ Failed to save terms: {e}")
 
     st.markdown("---")
     st.subheader("Client Information")
-    client_fields = ["Title", "Office", "Company", "Message", "Edited By"]
-    saved_values = {}
-    for i, field in enumerate(client_fields, start=14):
-        try:
-            saved_values[field] = ws.acell(f"J{i}").value or ""
-        except:
-            saved_values[field] = ""
+    saved_values = st.session_state[client_key]
 
     with st.form("client_form"):
         colA, colB = st.columns(2)
@@ -746,14 +994,29 @@ elif st.session_state.page == "project":
 
         submit_client = st.form_submit_button("Save Client Info")
         if submit_client:
-            updates = [
-                {"range": f"I{i}", "values": [[field]]} for i, field in enumerate(client_fields, start=14)
-            ] + [
-                {"range": f"J{i}", "values": [[value]]} for i, value in enumerate(
-                    [title_input, office_input, company_input, message_input, editedby_input], start=14)
-            ]
-            ws.batch_update(updates)
-            st.success("Client information saved!")
+            new_client_info = {
+                "Title": title_input,
+                "Office": office_input,
+                "Company": company_input,
+                "Message": message_input,
+                "Edited By": editedby_input
+            }
+            if f"pending_save_{project}" in st.session_state:
+                st.warning("A save is still in progress, please try again in a moment.")
+            elif new_client_info == saved_values:
+                st.info("No changes to save.")
+            else:
+                # labels and values are one contiguous block; the labels go out too since
+                # sheets created before they were written at creation don't have them
+                block_range = f"{CLIENT_LABELS[0][1]}:{CLIENT_LABELS[-1][2]}"
+                try:
+                    ws.batch_update([{"range": block_range,
+                                      "values": [[label, new_client_info[label]] for label, _, _ in CLIENT_LABELS]}])
+                    st.session_state[client_key] = new_client_info
+                    bump_sheet_revision()
+                    st.success("Client information saved!")
+                except APIError as e:
+                    st.error(f"❌ Failed to save client information: {e}")
 
 # ===============================================================
 # End of File